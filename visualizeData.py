@@ -1,11 +1,215 @@
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import os
 from dotenv import load_dotenv
 import pandas as pd
-import json
+import numpy as np
+import orjson   # parses the multi-MB SEC responses several times faster than json
 import plotly.graph_objects as go
 from typing import List    # for annotating function parameter types
 import finnhub
+import functools
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+import multiprocessing
+import threading
+import time
+import tempfile
+import pickle
+
+MAX_WORKERS = 8   # SEC allows at most 10 requests per second
+HTTP_POOL_SIZE = MAX_WORKERS   # connections kept alive per host, one for each worker thread
+SEC_REQUEST_INTERVAL = 0.1   # minimum seconds between requests to SEC, retries included
+REQUEST_TIMEOUT = 10   # seconds
+RETRIES = 3
+RETRY_BACKOFF = 0.5   # seconds, doubled after each failed attempt
+RETRY_STATUSES = [429, 500, 502, 503, 504]
+FETCH_ERRORS = (KeyError, requests.RequestException, ValueError)   # unknown ticker, network failure after retries, malformed response
+# parse workers start from a fresh interpreter rather than forking the threaded parent, forkserver imports this module only once
+PARSE_CONTEXT = multiprocessing.get_context("forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn")
+PARSE_POOL_MIN_TICKERS = 16   # below this, starting worker processes costs more than parsing in this process
+MAX_PARSE_WORKERS = 61   # ProcessPoolExecutor limit on Windows
+CACHE_DIR = "./.cache"
+COMPANY_FACTS_TTL = 24 * 60 * 60   # seconds before a cached companyfacts file is downloaded again
+PEERS_TTL = 7 * 24 * 60 * 60   # peer groups rarely change
+TICKERS_FILE = "./company_tickers.json"
+TICKER_MAP_FILE = "ticker_to_cik.pkl"   # stored in CACHE_DIR
+METRIC_CACHE_SIZE = 512
+PEERS_CACHE_SIZE = 256
+METRIC_COLUMNS = ["start", "end", "val", "accn", "fy", "fp", "form", "filed", "frame"]   # "start" is absent for instant metrics
+METRIC_DTYPES = {"val": "float64", "form": "category", "frame": "string"}
+FACTS_CACHE_SIZE = 32   # parsed us-gaap facts can be several MB each, so keep only a few in memory
+_MISSING = object()   # marks a MemoCache miss, since None is a valid memoized result
+
+
+def _parseUSGAAP(content: bytes) -> dict:
+  """ Returns the us-gaap facts from a raw companyfacts response
+  :param p1: companyfacts json as downloaded from SEC
+  :return: dictionary mapping each us-gaap metric to its reported units and values, raises ValueError if the response is malformed
+  """
+  document = orjson.loads(content)
+  if not isinstance(document, dict) or "facts" not in document:
+    raise ValueError("companyfacts response has no facts")
+  # keep only the us-gaap taxonomy so memoized facts don't hold on to dei/ifrs data that is never read
+  return document["facts"].get("us-gaap", {})
+
+
+def _extractMetric(company_facts: dict, metric: str) -> tuple:
+  """ Returns the reported rows for the metric from already downloaded facts
+  :param p1: us-gaap facts returned by _parseUSGAAP
+  :param p2: metric to get
+  :return: (list of reported values, units), raises KeyError if the company has no such metric
+  """
+  units = company_facts[metric]["units"]
+  try:
+    UNITS = next(iter(units))   # simply use first units, without building a list of every key
+  except StopIteration:
+    raise KeyError(metric) from None
+  return units[UNITS], UNITS
+
+
+def _latestValue(company_facts: dict, metric: str) -> tuple:
+  """ Returns the most recently reported value of the metric from already downloaded facts
+  :param p1: us-gaap facts returned by _parseUSGAAP
+  :param p2: metric to get
+  :return: (value, units), or None if there is no valid 10-Q value, raises KeyError if the company has no such metric
+  """
+  rows, UNITS = _extractMetric(company_facts, metric)
+  # same rows getMetricDF keeps, scanned from the end since only the last one is needed
+  val = next((row["val"] for row in reversed(rows) if row.get("frame") is not None and row["form"] == "10-Q"), None)
+  if val is None:
+    return None
+  return val, UNITS
+
+
+def _parseLatestValue(content: bytes, metric: str) -> tuple:
+  """ Parses a raw companyfacts response and returns the latest value of the metric, meant to run in a worker process
+  so only the small result is pickled back instead of the parsed facts
+  :param p1: companyfacts json as downloaded from SEC
+  :param p2: metric to get
+  :return: (value, units), or None if there is no valid 10-Q value, raises KeyError if the company has no such metric
+  """
+  return _latestValue(_parseUSGAAP(content), metric)
+
+
+def _parsePeers(content: bytes) -> tuple:
+  """ Returns the tickers in a raw Finnhub peers response
+  :param p1: peers json as downloaded from Finnhub
+  :return: tuple of similar companies, raises ValueError if the response is malformed
+  """
+  similar_companies_json = orjson.loads(content)
+  if not isinstance(similar_companies_json, list):
+    raise ValueError("Finnhub peers response is not a list")
+  return tuple(similar_companies_json)
+
+
+class MemoCache:
+
+  def __init__(self, maxsize: int):
+    """
+    Constructor, keeps the maxsize most recently used entries in memory, safe to use from any thread
+    """
+    self.maxsize = maxsize
+    self.entries = OrderedDict()
+    self.lock = threading.Lock()
+    return
+
+
+  def get(self, key, default=None):
+    """ Returns the memoized value for key
+    :param p1: key to look up
+    :param p2: value to return when key is not memoized
+    :return: memoized value, or default
+    """
+    with self.lock:
+      if key not in self.entries:
+        return default
+      self.entries.move_to_end(key)
+      return self.entries[key]
+
+
+  def put(self, key, value) -> None:
+    """ Memoizes value for key, evicting the least recently used entry when full
+    :param p1: key to store under
+    :param p2: value to store
+    """
+    with self.lock:
+      self.entries[key] = value
+      self.entries.move_to_end(key)
+      if len(self.entries) > self.maxsize:
+        self.entries.popitem(last=False)
+    return
+
+
+class FileCache:
+
+  def __init__(self, directory: str, ttl: float):
+    """
+    Constructor, stores raw responses as files in directory that expire after ttl seconds,
+    the cache is best effort so if directory can't be created every lookup is a miss
+    """
+    self.directory = directory
+    self.ttl = ttl
+    try:
+      os.makedirs(directory, exist_ok=True)
+      self.enabled = True
+    except OSError:
+      self.enabled = False
+    return
+
+
+  def get(self, key: str) -> bytes:
+    """ Returns the cached contents for key
+    :param p1: name of the cached file
+    :return: file contents, or None if missing or older than the ttl
+    """
+    if not self.enabled:
+      return None
+    path = os.path.join(self.directory, key)
+    try:
+      if time.time() - os.path.getmtime(path) > self.ttl:
+        return None
+      with open(path, "rb") as f:
+        return f.read()
+    except OSError:
+      return None
+
+
+  def put(self, key: str, content: bytes) -> None:
+    """ Writes content for key atomically so concurrent readers never see a partial file
+    :param p1: name of the cached file
+    :param p2: contents to store
+    """
+    if not self.enabled:
+      return
+    tmp_path = None
+    try:
+      os.makedirs(self.directory, exist_ok=True)   # in case the cache was removed while running
+      fd, tmp_path = tempfile.mkstemp(dir=self.directory)
+      with os.fdopen(fd, "wb") as f:
+        f.write(content)
+      os.replace(tmp_path, os.path.join(self.directory, key))
+    except OSError:
+      # failing to cache is never fatal, the content is simply fetched again next time
+      if tmp_path is not None:
+        self.delete(os.path.basename(tmp_path))
+    return
+
+
+  def delete(self, key: str) -> None:
+    """ Removes the cached contents for key, if any
+    :param p1: name of the cached file
+    """
+    if not self.enabled:
+      return
+    try:
+      os.remove(os.path.join(self.directory, key))
+    except OSError:
+      pass
+    return
+
 
 class VisualizeFilings:
 
@@ -13,7 +217,6 @@ class VisualizeFilings:
     """
     Constructor, makes headers and dictionaries used by other methods    
     """
-    self.ticker_to_CIK = {}
     load_dotenv()  # to load env variables from .env file for API key
     self.sec_header = {
       "User-Agent": os.getenv("USER_AGENT")
@@ -22,46 +225,298 @@ class VisualizeFilings:
       "X-Finnhub-Token": os.getenv("FINNHUB_API_KEY")
     }
 
-    with open("./company_tickers.json") as f:
-      company_list = json.load(f)["data"]
+    # one session keeps connections to SEC and Finnhub alive between requests and retries transient failures
+    self.session = requests.Session()
+    adapter = HTTPAdapter(pool_maxsize=HTTP_POOL_SIZE,
+                          max_retries=Retry(total=RETRIES, backoff_factor=RETRY_BACKOFF, status_forcelist=RETRY_STATUSES))
+    self.session.mount("https://", adapter)
+    # SEC requests are retried in _getCompanyFactsContent instead, so every attempt goes through _throttleSEC
+    self.session.mount("https://data.sec.gov/", HTTPAdapter(pool_maxsize=HTTP_POOL_SIZE))
+
+    self.sec_lock = threading.Lock()   # shared by worker threads to space out SEC requests
+    self.last_sec_request = 0.0
+    self.facts_cache = FileCache(os.path.join(CACHE_DIR, "companyfacts"), COMPANY_FACTS_TTL)
+    self.peers_cache = FileCache(os.path.join(CACHE_DIR, "peers"), PEERS_TTL)
+
+    # memoize per instance so repeated (ticker, metric) requests skip parsing and dataframe construction
+    self.getMetricDF = functools.lru_cache(maxsize=METRIC_CACHE_SIZE)(self.getMetricDF)
+    # explicit caches rather than lru_cache so overlappingHistogram can check what is already parsed
+    self.company_facts = MemoCache(FACTS_CACHE_SIZE)   # CIK -> us-gaap facts
+    self.latest_values = MemoCache(METRIC_CACHE_SIZE)   # (CIK, metric) -> (value, units), or None
+    self._getPeers = functools.lru_cache(maxsize=PEERS_CACHE_SIZE)(self._getPeers)
+
+    self.ticker_to_CIK, self.ticker_to_CIK_str = self._loadTickerMaps()
+
+    return
+
+
+  def _loadTickerMaps(self) -> tuple:
+    """ Returns the ticker to CIK maps, from the pickled copy unless company_tickers.json is newer
+    :return: (ticker to CIK, ticker to CIK zero padded to 10 digits)
+    """
+    # no ttl, the pickle is only stale once company_tickers.json changes
+    map_cache = FileCache(CACHE_DIR, float("inf"))
+    try:
+      if os.path.getmtime(os.path.join(CACHE_DIR, TICKER_MAP_FILE)) >= os.path.getmtime(TICKERS_FILE):
+        content = map_cache.get(TICKER_MAP_FILE)
+        if content is not None:
+          return pickle.loads(content)
+    except (OSError, pickle.UnpicklingError, EOFError):
+      pass
+
+    with open(TICKERS_FILE, "rb") as f:
+      company_json = orjson.loads(f.read())
+
+    # each company is structured as (CIK, Name, Ticker, Exchange)
+    company_df = pd.DataFrame(company_json["data"], columns=company_json["fields"])
+    ticker_to_CIK = dict(zip(company_df["ticker"].tolist(), company_df["cik"].tolist()))
+    # SEC urls use the CIK zero padded to 10 digits, so pad once here instead of on every request
+    ticker_to_CIK_str = dict(zip(company_df["ticker"].tolist(), company_df["cik"].astype(str).str.zfill(10).tolist()))
+
+    map_cache.put(TICKER_MAP_FILE, pickle.dumps((ticker_to_CIK, ticker_to_CIK_str), protocol=5))
+    return ticker_to_CIK, ticker_to_CIK_str
 
-    for company in company_list:
-      # each company is structured as (CIK, Name, Ticker, Exchange)
-      ticker = company[2]
-      CIK = company[0]
-      self.ticker_to_CIK[ticker] = CIK
 
+  def _throttleSEC(self) -> None:
+    """ Blocks until another SEC request can be sent without exceeding the rate limit, safe to call from any thread
+    """
+    with self.sec_lock:
+      wait = self.last_sec_request + SEC_REQUEST_INTERVAL - time.monotonic()
+      if wait > 0:
+        time.sleep(wait)
+      self.last_sec_request = time.monotonic()
     return
 
 
+  def _downloadCompanyFacts(self, CIK: str) -> bytes:
+    """ Downloads the raw companyfacts json SEC has for the company, retrying transient failures
+    :param p1: CIK of company, zero padded to 10 digits
+    :return: unparsed response body
+    """
+    url = f"https://data.sec.gov/api/xbrl/companyfacts/CIK{CIK}.json"
+    for attempt in range(RETRIES + 1):
+      self._throttleSEC()
+      try:
+        response = self.session.get(url, headers=self.sec_header, timeout=REQUEST_TIMEOUT)
+      except (requests.ConnectionError, requests.Timeout):
+        if attempt == RETRIES:
+          raise
+      else:
+        if response.status_code not in RETRY_STATUSES or attempt == RETRIES:
+          break
+      time.sleep(RETRY_BACKOFF * 2 ** attempt)
+    response.raise_for_status()
+    return response.content
+
+
+  def _getCompanyFactsContent(self, CIK: str) -> bytes:
+    """ Returns the raw companyfacts json SEC has for the company, from the disk cache when fresh. The content is cached
+    before anyone parses it, so callers must delete the cache entry if it turns out to be malformed
+    :param p1: CIK of company, zero padded to 10 digits
+    :return: unparsed response body
+    """
+    filename = f"CIK{CIK}.json"
+    content = self.facts_cache.get(filename)
+    if content is None:
+      content = self._downloadCompanyFacts(CIK)
+      self.facts_cache.put(filename, content)
+    return content
+
+
+  def _getCompanyFacts(self, CIK: str) -> dict:
+    """ Returns the us-gaap XBRL facts SEC has for the company, from the disk cache when fresh
+    :param p1: CIK of company, zero padded to 10 digits
+    :return: dictionary mapping each us-gaap metric to its reported units and values
+    """
+    company_facts = self.company_facts.get(CIK)
+    if company_facts is not None:
+      return company_facts
+    filename = f"CIK{CIK}.json"
+    content = self.facts_cache.get(filename)
+    if content is not None:
+      try:
+        company_facts = _parseUSGAAP(content)
+      except ValueError:
+        self.facts_cache.delete(filename)   # corrupt cache entry, download it again
+    if company_facts is None:
+      content = self._downloadCompanyFacts(CIK)
+      company_facts = _parseUSGAAP(content)
+      self.facts_cache.put(filename, content)   # only cache responses that parsed
+    self.company_facts.put(CIK, company_facts)
+    return company_facts
+
+
+  def _getTickerFacts(self, ticker: str) -> dict:
+    """ Returns the us-gaap XBRL facts SEC has for the ticker
+    :param p1: ticker of company
+    :return: dictionary mapping each us-gaap metric to its reported units and values, raises KeyError for unknown tickers
+    """
+    return self._getCompanyFacts(self.ticker_to_CIK_str[ticker])
+
+
+  def _extractLatestValue(self, ticker: str, company_facts: dict, metric: str) -> tuple:
+    """ Returns the most recently reported value of the metric from already downloaded facts
+    :param p1: ticker of company
+    :param p2: us-gaap facts returned by _getCompanyFacts
+    :param p3: metric to get
+    :return: (value, units), or None if the company has no valid 10-Q value for the metric
+    """
+    try:
+      return _latestValue(company_facts, metric)
+    except KeyError:
+      print(f"{ticker} has no {metric}")
+      return None
+
+
   def getMetricDF(self, ticker: str, metric: str) -> pd.DataFrame:
     """ Returns dataframe containing the ticker's time series data for the metric
     :param p1: ticker of company
     :param p2: metric to get
     :return: dataframe containing data for that company's metric
     """
-    CIK = self.ticker_to_CIK[ticker]
-    url = f"https://data.sec.gov/api/xbrl/companyfacts/CIK{str(CIK).zfill(10)}.json"
-    company_facts = requests.get(url, headers=self.sec_header).json()
+    company_facts = self._getCompanyFacts(self.ticker_to_CIK_str[ticker])
     try:
-      UNITS = list(company_facts["facts"]["us-gaap"][metric]["units"])[0]   # simply use first units
-      metric_df = pd.DataFrame(company_facts["facts"]["us-gaap"][metric]["units"][UNITS])
-      metric_df = metric_df[metric_df.frame.notna()][metric_df.form == "10-Q"]  # retain only valid time frames
+      rows, UNITS = _extractMetric(company_facts, metric)
+      metric_df = pd.DataFrame.from_records(rows, columns=METRIC_COLUMNS)
+      metric_df = metric_df.astype(METRIC_DTYPES)
+      mask = metric_df["frame"].notna() & (metric_df["form"] == "10-Q")   # retain only valid time frames
+      metric_df = metric_df.loc[mask]
       return metric_df, UNITS
-    except:
+    except (KeyError, ValueError):
       print(f"{ticker} has no {metric}")
       return None
+
+
+  def getLatestMetricValue(self, ticker: str, metric: str) -> tuple:
+    """ Returns the most recently reported value of the metric without building a dataframe
+    :param p1: ticker of company
+    :param p2: metric to get
+    :return: (value, units), or None if the company has no valid 10-Q value for the metric
+    """
+    CIK = self.ticker_to_CIK_str[ticker]
+    latest = self.latest_values.get((CIK, metric), _MISSING)
+    if latest is _MISSING:
+      latest = self._extractLatestValue(ticker, self._getCompanyFacts(CIK), metric)
+      self.latest_values.put((CIK, metric), latest)
+    return latest
+  
+
+  def _fetchMany(self, tickers: List[str], metric: str, latest: bool = False) -> dict:
+    """ Fetches the metric for every ticker concurrently
+    :param p1: list of company tickers
+    :param p2: metric to get
+    :param p3: fetch only the most recent value instead of the whole time series
+    :return: dictionary mapping each ticker that has the metric to (dataframe or latest value, units), in the order given
+    """
+    fetch = self.getLatestMetricValue if latest else self.getMetricDF
+    results = {}
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+      futures = {executor.submit(fetch, ticker, metric): ticker for ticker in tickers}
+      for future in as_completed(futures):
+        try:
+          result = future.result()
+        except FETCH_ERRORS as e:
+          print(f"Could not get {metric} for {futures[future]}: {e!r}")
+          continue
+        if result is not None:
+          results[futures[future]] = result
+    return {ticker: results[ticker] for ticker in tickers if ticker in results}
   
 
+  def _getPeers(self, ticker: str, criteria: str) -> tuple:
+    """ Returns the Finnhub peers of the given ticker, from the disk cache when fresh
+    :param p1: ticker of company
+    :param p2: criteria for finding similar companies, one of (sector, industry, subIndustry)
+    :return: tuple containing similar companies, immutable since it is memoized and shared between callers
+    """
+    filename = f"{criteria}_{ticker}.json"
+    content = self.peers_cache.get(filename)
+    if content is not None:
+      try:
+        return _parsePeers(content)
+      except ValueError:
+        self.peers_cache.delete(filename)   # corrupt cache entry, download it again
+    url = f"https://finnhub.io/api/v1/stock/peers?symbol={ticker}&grouping={criteria}"
+    response = self.session.get(url, headers=self.finnhub_header, timeout=REQUEST_TIMEOUT)
+    response.raise_for_status()
+    peers = _parsePeers(response.content)
+    self.peers_cache.put(filename, response.content)   # only cache responses that parsed
+    return peers
+
+
+  def _fetchLatestInProcesses(self, tickers: List[str], metric: str) -> dict:
+    """ Fetches the latest value of the metric for many tickers. Values already memoized are reused, and when many
+    companies are still unparsed they are downloaded in threads (I/O bound) and parsed in worker processes
+    (CPU bound, limited by the GIL in threads)
+    :param p1: list of company tickers
+    :param p2: metric to get
+    :return: dictionary mapping each ticker that has the metric to (latest value, units)
+    """
+    results = {}
+    pending = []   # tickers whose facts are not parsed in this session yet
+    for ticker in tickers:
+      try:
+        CIK = self.ticker_to_CIK_str[ticker]
+      except KeyError as e:
+        print(f"Could not get filings for {ticker}: {e!r}")
+        continue
+      latest = self.latest_values.get((CIK, metric), _MISSING)
+      if latest is _MISSING:
+        company_facts = self.company_facts.get(CIK)
+        if company_facts is None:
+          pending.append(ticker)
+          continue
+        latest = self._extractLatestValue(ticker, company_facts, metric)
+        self.latest_values.put((CIK, metric), latest)
+      if latest is not None:
+        results[ticker] = latest
+
+    if len(pending) < PARSE_POOL_MIN_TICKERS:
+      results.update(self._fetchMany(pending, metric, latest=True))
+      return results
+
+    # start the process pool before any download thread exists
+    parse_workers = min(os.cpu_count() or 1, len(pending), MAX_PARSE_WORKERS)
+    with ProcessPoolExecutor(max_workers=parse_workers, mp_context=PARSE_CONTEXT) as parse_pool, \
+         ThreadPoolExecutor(max_workers=MAX_WORKERS) as download_pool:
+      downloads = {download_pool.submit(self._getCompanyFactsContent, self.ticker_to_CIK_str[ticker]): ticker for ticker in pending}
+      parses = {}
+      for future in as_completed(downloads):
+        ticker = downloads[future]
+        try:
+          content = future.result()
+          parses[ticker] = parse_pool.submit(_parseLatestValue, content, metric)
+        except FETCH_ERRORS as e:
+          print(f"Could not get filings for {ticker}: {e!r}")
+        except BrokenProcessPool as e:
+          print(f"Could not parse filings for {ticker}: {e!r}")
+      for ticker, future in parses.items():
+        CIK = self.ticker_to_CIK_str[ticker]
+        try:
+          latest = future.result()
+        except KeyError:
+          print(f"{ticker} has no {metric}")
+          latest = None
+        except ValueError as e:
+          self.facts_cache.delete(f"CIK{CIK}.json")   # don't serve the malformed response again
+          print(f"Could not get filings for {ticker}: {e!r}")
+          continue
+        except BrokenProcessPool as e:
+          print(f"Could not parse filings for {ticker}: {e!r}")
+          continue
+        self.latest_values.put((CIK, metric), latest)
+        if latest is not None:
+          results[ticker] = latest
+    return results
+
+
   def getSimilarCompanies(self, ticker: str, criteria: str) -> List[str]:
     """ Returns a list of companies similar to the given ticker
     :param p1: ticker of company
     :param p2: criteria for finding similar companies, one of (sector, industry, subIndustry)
     :return: list containing similar companies
     """
-    url = f"https://finnhub.io/api/v1/stock/peers?symbol={ticker}&grouping={criteria}"
-    similar_companies_json = requests.get(url, headers=self.finnhub_header).json()
-    return list(similar_companies_json)
+    return list(self._getPeers(ticker, criteria))
 
 
   def lineGraph(self, metric: str, tickers: List[str]) -> None:
@@ -71,20 +526,16 @@ class VisualizeFilings:
     """
     if len(tickers) == 1:
       tickers = self.getSimilarCompanies(tickers[0], "sector")
-    fig = go.Figure()
-    for ticker in tickers:
-      try:
-        metric_df, UNITS = self.getMetricDF(ticker, metric)
-        fig.add_trace(go.Scatter(x=metric_df["end"], y=metric_df["val"],
-                                  mode="lines",
-                                  name=ticker))
-      except:
-        continue
-    fig.update_layout(title=f"{metric} Over Time",
-                      title_x=0.5,
-                      xaxis_title="Time",
-                      yaxis_title=f"{metric} ({UNITS})",
-                      legend_title="Tickers")
+    traces = []
+    for ticker, (metric_df, UNITS) in self._fetchMany(tickers, metric).items():
+      traces.append(go.Scatter(x=metric_df["end"].to_numpy(), y=metric_df["val"].to_numpy(dtype=np.float64),
+                               mode="lines",
+                               name=ticker))
+    layout = go.Layout(title=dict(text=f"{metric} Over Time", x=0.5),
+                       xaxis_title="Time",
+                       yaxis_title=f"{metric} ({UNITS})",
+                       legend_title="Tickers")
+    fig = go.Figure(data=traces, layout=layout)
     fig.show()
     return
    
@@ -96,25 +547,21 @@ class VisualizeFilings:
     """
     if len(tickers) == 1:
       tickers = self.getSimilarCompanies(tickers[0], "sector")
-    fig = go.Figure()
-    for ticker in tickers:
-      try:
-        metric_df, UNITS = self.getMetricDF(ticker, metric)
-        fig.add_trace(go.Scatter(
-          x=metric_df["end"], y=metric_df["val"],
-          hoverinfo="x+y",
-          mode="lines",
-          line=dict(width=0.5),
-          stackgroup="one",
-          name=ticker
-        ))
-      except:
-        continue
-    fig.update_layout(title=f"{metric} Over Time",
-                      title_x=0.5,
-                      xaxis_title="Time",
-                      yaxis_title=f"{metric} ({UNITS})",
-                      legend_title="Tickers")
+    traces = []
+    for ticker, (metric_df, UNITS) in self._fetchMany(tickers, metric).items():
+      traces.append(go.Scatter(
+        x=metric_df["end"].to_numpy(), y=metric_df["val"].to_numpy(dtype=np.float64),
+        hoverinfo="x+y",
+        mode="lines",
+        line=dict(width=0.5),
+        stackgroup="one",
+        name=ticker
+      ))
+    layout = go.Layout(title=dict(text=f"{metric} Over Time", x=0.5),
+                       xaxis_title="Time",
+                       yaxis_title=f"{metric} ({UNITS})",
+                       legend_title="Tickers")
+    fig = go.Figure(data=traces, layout=layout)
     fig.show()
     return
   
@@ -126,23 +573,13 @@ class VisualizeFilings:
     """
     if len(tickers) == 1:
       tickers = self.getSimilarCompanies(tickers[0], "sector")
-    val_map = {}
-    for ticker in tickers:
-      try:
-        metric_df, UNITS = self.getMetricDF(ticker, metric)
-        val_map[ticker] = metric_df.tail(1)["val"].iloc[0]
-      except:
-        continue
-    ticker_list = []
-    val_list = []
-    for key in val_map:
-      ticker_list.append(key)
-      val_list.append(val_map[key])
-    fig = go.Figure(data=[go.Pie(labels=ticker_list, values=val_list)])
-    fig.update_layout(title=f"{metric} Comparison",
-                      title_x=0.5,
-                      legend_title="Tickers")
-    fig.update_traces(textposition='inside', textinfo='percent+label')
+    val_map = self._fetchMany(tickers, metric, latest=True)
+    ticker_list = list(val_map)
+    val_array = np.fromiter((val for val, _ in val_map.values()), dtype=np.float64, count=len(val_map))
+    layout = go.Layout(title=dict(text=f"{metric} Comparison", x=0.5),
+                       legend_title="Tickers")
+    fig = go.Figure(data=[go.Pie(labels=ticker_list, values=val_array, textposition='inside', textinfo='percent+label')],
+                    layout=layout)
     fig.show()
     return
   
@@ -150,59 +587,62 @@ class VisualizeFilings:
   def scatterPlot(self, metric1: str, metric2: str, tickers: List[str]) -> None:
     if len(tickers) == 1:
       tickers = self.getSimilarCompanies(tickers[0], "sector")
-    xy_map = {}
-    for ticker in tickers:
-      try:
-        metric1_df, UNITS1 = self.getMetricDF(ticker, metric1)
-        metric2_df, UNITS2 = self.getMetricDF(ticker, metric2)
-        xy_map[ticker] = [metric1_df.tail(1)["val"].iloc[0], metric2_df.tail(1)["val"].iloc[0]]
-      except:
-        continue
     ticker_list = []
-    x_list = []
-    y_list = []
-    for key in xy_map:
-      ticker_list.append(key)
-      x_list.append(xy_map[key][0])
-      y_list.append(xy_map[key][1])
+    x_array = np.empty(len(tickers))
+    y_array = np.empty(len(tickers))
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+      # download each company's facts once and read both metrics from them
+      futures = {ticker: executor.submit(self._getTickerFacts, ticker) for ticker in tickers}
+      for ticker in tickers:
+        try:
+          company_facts = futures[ticker].result()
+        except FETCH_ERRORS as e:
+          print(f"Could not get filings for {ticker}: {e!r}")
+          continue
+        latest1 = self._extractLatestValue(ticker, company_facts, metric1)
+        latest2 = self._extractLatestValue(ticker, company_facts, metric2)
+        if latest1 is None or latest2 is None:
+          continue
+        val1, UNITS1 = latest1
+        val2, UNITS2 = latest2
+        x_array[len(ticker_list)] = val1
+        y_array[len(ticker_list)] = val2
+        ticker_list.append(ticker)
+    layout = go.Layout(title=dict(text=f"{metric1} ({UNITS1}) and {metric2} ({UNITS2}) Comparison", x=0.5),
+                       xaxis_title=f"{metric1} ({UNITS1})",
+                       yaxis_title=f"{metric2} ({UNITS2})")
     fig = go.Figure(data=go.Scatter(
-      x=x_list,
-      y=y_list,
+      x=x_array[:len(ticker_list)],
+      y=y_array[:len(ticker_list)],
       mode="markers",
       marker=dict(size=15,
-                  color=[c for c in range(len(ticker_list))]),
+                  color=np.arange(len(ticker_list))),
       text=ticker_list
-    ))
-    fig.update_layout(title=f"{metric1} ({UNITS1}) and {metric2} ({UNITS2}) Comparison",
-                      title_x=0.5,
-                      xaxis_title=f"{metric1} ({UNITS1})",
-                      yaxis_title=f"{metric2} ({UNITS2})"
-                    )
+    ), layout=layout)
     fig.show()
     return
   
 
   def overlappingHistogram(self, metric: str, industries: List[str]) -> None:
-    with open("./finnhub_industries.json") as f:
-      industry_dict = json.load(f)
-    fig = go.Figure()
+    with open("./finnhub_industries.json", "rb") as f:
+      industry_dict = orjson.loads(f.read())
+    # fetch every industry's tickers in one pool instead of one industry at a time
+    all_tickers = list(dict.fromkeys(ticker for industry in industries for ticker in industry_dict[industry]))
+    results = self._fetchLatestInProcesses(all_tickers, metric)
+    traces = []
     for industry in industries:
-      tickers = industry_dict[industry]
       metric_list = []
-      for ticker in tickers:
-        try:
-          metric_df, UNITS = self.getMetricDF(ticker, metric)
-          metric_list.append(metric_df.tail(1)["val"].iloc[0])
-        except:
-          continue
-      fig.add_trace(go.Histogram(x=metric_list, nbinsx=80, name=industry))
-    fig.update_layout(barmode='overlay')
-    fig.update_traces(opacity=0.5)
-    fig.update_layout(title=f"Distribution of {metric} by Industry",
-                      title_x=0.5,
-                      xaxis_title=f"{metric} ({UNITS})",
-                      yaxis_title=f"Count",
-                      legend_title="Industries")
+      for ticker in industry_dict[industry]:
+        if ticker in results:
+          val, UNITS = results[ticker]
+          metric_list.append(val)
+      traces.append(go.Histogram(x=metric_list, nbinsx=80, name=industry, opacity=0.5))
+    layout = go.Layout(barmode='overlay',
+                       title=dict(text=f"Distribution of {metric} by Industry", x=0.5),
+                       xaxis_title=f"{metric} ({UNITS})",
+                       yaxis_title=f"Count",
+                       legend_title="Industries")
+    fig = go.Figure(data=traces, layout=layout)
     fig.show()
     return
 